@@ -1,5 +1,7 @@
+import math
+
 import numpy as np
-from scipy.integrate import solve_ivp
+from scipy.linalg import expm
 import matplotlib.pyplot as plt
 from matplotlib import animation
 from mpl_toolkits.mplot3d import Axes3D
@@ -12,6 +14,8 @@ CL = 818.4
 V1 = 2700
 V2 = 774
 Q = 16.512
+k12 = Q / V1
+k21 = Q / V2
 
 kge = 0.001
 kkill = 0.1
@@ -29,58 +33,77 @@ duree_simulation = 365
 dt_step = 0.1  # pas d'intégration
 
 # -----------------------------
-# 3. MODÈLE ODE
+# 3. MODÈLE : PK ANALYTIQUE + ODE TUMEUR
 # -----------------------------
-def modele_tgi(t, y, dose_active=True):
-    A_gut, Ac, Ap, TS, temps_depuis_traitement = y
-    k12 = Q / V1
-    k21 = Q / V2
-
-    dA_gut = -ka * A_gut
-    dAc = ka * A_gut - k12*Ac - (CL/V1)*Ac + k21*Ap
-    dAp = k12*Ac - k21*Ap
+# Le bloc PK (A_gut, Ac, Ap) est linéaire à coefficients constants : entre
+# deux pas sa solution exacte est pk(t+dt) = expm(M*dt) @ pk(t). Seule
+# l'équation scalaire de TS reste intégrée numériquement (RK4 à pas fixe).
+M = np.array([[-ka, 0.0, 0.0],
+              [ka, -(k12 + CL/V1), k21],
+              [0.0, k12, -k21]])
 
-    EXPOSURE = Ac / V1
-    dtemps_depuis_traitement = 1.0 if dose_active else 0.0
-    K = kkill * EXPOSURE * np.exp(-lambda_res * temps_depuis_traitement) * np.exp(-0.1*TS) if dose_active else 0.0
+def derivee_TS(TS, EXPOSURE, temps_depuis_traitement, dose_active):
+    K = kkill * EXPOSURE * math.exp(-lambda_res * temps_depuis_traitement - 0.1*TS) if dose_active else 0.0
 
     if TS > 1e12:
-        dTS = 0
+        return 0.0
     elif TS < 0.08:
-        dTS = -K * TS
+        return -K * TS
     else:
-        dTS = kge * TS - K * TS
-
-    return [dA_gut, dAc, dAp, dTS, dtemps_depuis_traitement]
+        return kge * TS - K * TS
 
 # -----------------------------
 # 4. SIMULATION
 # -----------------------------
 t_eval = np.arange(0, duree_simulation + dt_step, dt_step)
 
-A_gut, Ac, Ap, TS, temps_depuis_traitement = 0.0, 0.0, 0.0, TS0, 0.0
-TS_list, EXPOSURE_list, t_list = [], [], []
+Phi = expm(M * dt_step)        # propagateur PK sur un pas
+Phi_demi = expm(M * dt_step / 2)  # propagateur PK sur un demi-pas (étages RK4)
+
+pk = np.zeros(3)  # A_gut, Ac, Ap
+TS = TS0
+temps_depuis_traitement = 0.0
+# array preallocés : une valeur par pas, pas d'append sur des listes Python
+TS_array = np.empty(len(t_eval))
+EXPOSURE_array = np.empty(len(t_eval))
+
+# indices de la grille où tombent les doses (comparaison entière au lieu
+# d'un test en virgule flottante à chaque pas)
+indices_doses = np.searchsorted(t_eval, temps_doses - 1e-6)
 
 indice_dose = 0
-for t in t_eval:
-    if indice_dose < len(temps_doses) and abs(t - temps_doses[indice_dose]) < 1e-6:
-        A_gut += dose
+for i, t in enumerate(t_eval):
+    if indice_dose < len(indices_doses) and i == indices_doses[indice_dose]:
+        pk[0] += dose
         indice_dose += 1
 
     dose_active = t <= duree_traitement
 
-    y_current = [A_gut, Ac, Ap, TS, temps_depuis_traitement]
-    sol = solve_ivp(lambda t, y: modele_tgi(t, y, dose_active=dose_active),
-                    [0, dt_step], y_current, method='RK45', t_eval=[dt_step])
-    A_gut, Ac, Ap, TS, temps_depuis_traitement = sol.y[:, -1]
-
-    TS_list.append(TS)
-    EXPOSURE_list.append(Ac / V1)
-    t_list.append(t)
-
-TS_array = np.array(TS_list)
-EXPOSURE_array = np.array(EXPOSURE_list)
-t_array = np.array(t_list)
+    if TS < 1e-12:
+        # tumeur disparue : on fige TS à zéro et on ne propage plus que la PK
+        TS = 0.0
+        pk = Phi @ pk
+    else:
+        pk_demi = Phi_demi @ pk
+        pk_suivant = Phi @ pk
+        expo_0 = pk[1] / V1
+        expo_demi = pk_demi[1] / V1
+        expo_1 = pk_suivant[1] / V1
+
+        h = dt_step
+        dtau = h if dose_active else 0.0
+        k1 = derivee_TS(TS, expo_0, temps_depuis_traitement, dose_active)
+        k2 = derivee_TS(TS + 0.5*h*k1, expo_demi, temps_depuis_traitement + 0.5*dtau, dose_active)
+        k3 = derivee_TS(TS + 0.5*h*k2, expo_demi, temps_depuis_traitement + 0.5*dtau, dose_active)
+        k4 = derivee_TS(TS + h*k3, expo_1, temps_depuis_traitement + dtau, dose_active)
+        TS = TS + h/6 * (k1 + 2*k2 + 2*k3 + k4)
+        temps_depuis_traitement += dtau
+        pk = pk_suivant
+
+    TS_array[i] = TS
+    EXPOSURE_array[i] = pk[1] / V1
+
+t_array = t_eval
 
 # -----------------------------
 # 5. ANIMATION: SPHÈRE + COURBES + RÉFÉRENCES + RÉGION TOXICITÉ + LIGNES FIN TRAITEMENT
@@ -96,8 +119,8 @@ ax3d.set_zlim([-TS0, TS0])
 ax3d.set_box_aspect([1,1,1])
 ax3d.set_title("Évolution de la tumeur")
 
-u = np.linspace(0, 2*np.pi, 50)
-v = np.linspace(0, np.pi, 50)
+u = np.linspace(0, 2*np.pi, 20)
+v = np.linspace(0, np.pi, 20)
 U, V = np.meshgrid(u, v)
 
 # Subplot diamètre
@@ -127,6 +150,14 @@ ax_exp.set_title("Exposition au cours du temps")
 ax_exp.set_box_aspect(1)
 ax_exp.legend(loc='upper left', bbox_to_anchor=(1.05, 1))
 
+# tampons pleine longueur : l'axe x est fixé une fois pour toutes et les
+# frames ne font que remplir les valeurs y déjà allouées (pas de re-tranchage
+# des tableaux qui grossit à chaque frame)
+diam_buffer = np.full(len(t_array), np.nan)
+expo_buffer = np.full(len(t_array), np.nan)
+line_diam.set_data(t_array, diam_buffer)
+line_exp.set_data(t_array, expo_buffer)
+
 # Frame tous les 10 jours
 frame_indices = np.arange(0, len(t_array), int(10/dt_step))
 
@@ -144,8 +175,10 @@ def update(frame_idx):
     ax3d.set_title(f"Tumeur - Jour {t_array[frame]:.1f}")
 
     # mise à jour courbes
-    line_diam.set_data(t_array[:frame+1], TS_array[:frame+1])
-    line_exp.set_data(t_array[:frame+1], EXPOSURE_array[:frame+1])
+    diam_buffer[:frame+1] = TS_array[:frame+1]
+    expo_buffer[:frame+1] = EXPOSURE_array[:frame+1]
+    line_diam.set_ydata(diam_buffer)
+    line_exp.set_ydata(expo_buffer)
 
     return ax3d, line_diam, line_exp
 
@@ -1,5 +1,7 @@
+import math
+
 import numpy as np
-from scipy.integrate import solve_ivp
+from scipy.integrate import odeint
 import matplotlib.pyplot as plt
 from matplotlib import animation
 from mpl_toolkits.mplot3d import Axes3D
@@ -12,6 +14,8 @@ CL = 818.4
 V1 = 2700
 V2 = 774
 Q = 16.512
+k12 = Q / V1
+k21 = Q / V2
 
 kge = 0.001
 kkill = 0.1
@@ -33,16 +37,13 @@ dt_step = 0.1  # pas d'intégration
 # -----------------------------
 def modele_tgi(t, y, dose_active=True):
     A_gut, Ac, Ap, TS, temps_depuis_traitement = y
-    k12 = Q / V1
-    k21 = Q / V2
-
     dA_gut = -ka * A_gut
     dAc = ka * A_gut - k12*Ac - (CL/V1)*Ac + k21*Ap
     dAp = k12*Ac - k21*Ap
 
     EXPOSURE = Ac / V1
     dtemps_depuis_traitement = 1.0 if dose_active else 0.0
-    K = kkill * EXPOSURE * np.exp(-lambda_res * temps_depuis_traitement) * np.exp(-0.1*TS) if dose_active else 0.0
+    K = kkill * EXPOSURE * math.exp(-lambda_res * temps_depuis_traitement - 0.1*TS) if dose_active else 0.0
 
     if TS > 1e12:
         dTS = 0
@@ -51,32 +52,70 @@ def modele_tgi(t, y, dose_active=True):
     else:
         dTS = kge * TS - K * TS
 
-    return [dA_gut, dAc, dAp, dTS, dtemps_depuis_traitement]
+    return dA_gut, dAc, dAp, dTS, dtemps_depuis_traitement
+
+def jacobien_tgi(t, y, dose_active=True):
+    """Jacobien analytique de modele_tgi (le bloc PK est linéaire)."""
+    A_gut, Ac, Ap, TS, temps_depuis_traitement = y
+    J = np.zeros((5, 5))
+    J[0, 0] = -ka
+    J[1, 0] = ka
+    J[1, 1] = -k12 - CL/V1
+    J[1, 2] = k21
+    J[2, 1] = k12
+    J[2, 2] = -k21
+
+    if dose_active:
+        attenuation = math.exp(-lambda_res * temps_depuis_traitement - 0.1*TS)
+        K = kkill * (Ac / V1) * attenuation
+        dK_dAc = kkill / V1 * attenuation
+    else:
+        K = 0.0
+        dK_dAc = 0.0
+
+    if TS <= 1e12:
+        croissance = kge if TS >= 0.08 else 0.0
+        J[3, 1] = -dK_dAc * TS
+        J[3, 3] = croissance - K + 0.1 * K * TS
+        J[3, 4] = lambda_res * K * TS
+
+    return J
 
 # -----------------------------
 # 4. SIMULATION
 # -----------------------------
+# Une seule résolution par intervalle entre deux doses (au lieu d'un appel
+# au solveur tous les dt_step) : chaque dose est une impulsion sur A_gut
+# appliquée entre deux segments, et t_eval récupère la grille fine.
 t_eval = np.arange(0, duree_simulation + dt_step, dt_step)
 
-A_gut, Ac, Ap, TS, temps_depuis_traitement = 0.0, 0.0, 0.0, TS0, 0.0
+y_current = [0.0, 0.0, 0.0, TS0, 0.0]
 TS_list, EXPOSURE_list, t_list = [], [], []
 
-indice_dose = 0
-for t in t_eval:
-    if indice_dose < len(temps_doses) and abs(t - temps_doses[indice_dose]) < 1e-6:
-        A_gut += dose
-        indice_dose += 1
-
-    dose_active = t <= duree_traitement
-
-    y_current = [A_gut, Ac, Ap, TS, temps_depuis_traitement]
-    sol = solve_ivp(lambda t, y: modele_tgi(t, y, dose_active=dose_active),
-                    [0, dt_step], y_current, method='RK45', t_eval=[dt_step])
-    A_gut, Ac, Ap, TS, temps_depuis_traitement = sol.y[:, -1]
-
-    TS_list.append(TS)
-    EXPOSURE_list.append(Ac / V1)
-    t_list.append(t)
+bornes = np.append(temps_doses, duree_simulation)
+for t_debut, t_fin in zip(bornes[:-1], bornes[1:]):
+    y_current[0] += dose  # impulsion de dose dans A_gut
+    dose_active = t_fin <= duree_traitement
+
+    # odeint appelle le cœur Fortran de LSODA directement, avec moins de
+    # surcoût par appel que solve_ivp
+    t_seg = np.append(t_eval[(t_eval >= t_debut) & (t_eval < t_fin)], t_fin)
+    y_seg = odeint(modele_tgi, y_current, t_seg,
+                   rtol=1e-6, atol=1e-9, tfirst=True,
+                   Dfun=jacobien_tgi, args=(dose_active,))
+    y_current = y_seg[-1]
+    if y_current[3] < 1e-12:
+        # tumeur disparue : on fige TS exactement à zéro
+        y_current[3] = 0.0
+
+    TS_list.extend(y_seg[:-1, 3])
+    EXPOSURE_list.extend(y_seg[:-1, 1] / V1)
+    t_list.extend(t_seg[:-1])
+
+# état final en fin de simulation
+t_list.append(bornes[-1])
+TS_list.append(y_current[3])
+EXPOSURE_list.append(y_current[1] / V1)
 
 TS_array = np.array(TS_list)
 EXPOSURE_array = np.array(EXPOSURE_list)
@@ -96,8 +135,8 @@ ax3d.set_zlim([-TS0, TS0])
 ax3d.set_box_aspect([1,1,1])
 ax3d.set_title("Évolution de la tumeur")
 
-u = np.linspace(0, 2*np.pi, 50)
-v = np.linspace(0, np.pi, 50)
+u = np.linspace(0, 2*np.pi, 20)
+v = np.linspace(0, np.pi, 20)
 U, V = np.meshgrid(u, v)
 
 # Subplot diamètre
@@ -127,6 +166,14 @@ ax_exp.set_title("Exposition au cours du temps")
 ax_exp.set_box_aspect(1)
 ax_exp.legend(loc='upper left', bbox_to_anchor=(1.05, 1))
 
+# tampons pleine longueur : l'axe x est fixé une fois pour toutes et les
+# frames ne font que remplir les valeurs y déjà allouées (pas de re-tranchage
+# des tableaux qui grossit à chaque frame)
+diam_buffer = np.full(len(t_array), np.nan)
+expo_buffer = np.full(len(t_array), np.nan)
+line_diam.set_data(t_array, diam_buffer)
+line_exp.set_data(t_array, expo_buffer)
+
 # Frame tous les 10 jours
 frame_indices = np.arange(0, len(t_array), int(10/dt_step))
 
@@ -144,8 +191,10 @@ def update(frame_idx):
     ax3d.set_title(f"Tumeur - Jour {t_array[frame]:.1f}")
 
     # mise à jour courbes
-    line_diam.set_data(t_array[:frame+1], TS_array[:frame+1])
-    line_exp.set_data(t_array[:frame+1], EXPOSURE_array[:frame+1])
+    diam_buffer[:frame+1] = TS_array[:frame+1]
+    expo_buffer[:frame+1] = EXPOSURE_array[:frame+1]
+    line_diam.set_ydata(diam_buffer)
+    line_exp.set_ydata(expo_buffer)
 
     return ax3d, line_diam, line_exp
 
@@ -1,8 +1,11 @@
+import math
+
 import numpy as np
-from scipy.integrate import solve_ivp
+from scipy.integrate import odeint
 import matplotlib.pyplot as plt
 from matplotlib import animation
 from mpl_toolkits.mplot3d import Axes3D
+from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 
 """
 Simulazione modello TGI con dosaggio orale multiplo
@@ -24,6 +27,8 @@ CL = 818.4           # clearance centrale [L/d]
 V1 = 2700            # volume compartimento centrale [L]
 V2 = 774             # volume compartimento periferico [L]
 Q = 16.512           # intercompartmental clearance [L/d]
+k12 = Q / V1         # costante di trasferimento 1->2 [1/d]
+k21 = Q / V2         # costante di trasferimento 2->1 [1/d]
 
 kge = 0.001          # crescita tumorale esponenziale [1/d]
 kkill = 0.1          # tasso killing farmaco [1/d]
@@ -53,9 +58,6 @@ dose_times = np.array(dose_times)
 # -----------------------------
 def tgi_model(t, y, dose_active=True):
     A_gut, Ac, Ap, TS, timeSinceTrtStart = y
-    k12 = Q / V1
-    k21 = Q / V2
-
     dA_gut = -ka * A_gut
     dAc = ka * A_gut - k12*Ac - (CL/V1)*Ac + k21*Ap
     dAp = k12*Ac - k21*Ap
@@ -63,7 +65,7 @@ def tgi_model(t, y, dose_active=True):
     EXPOSURE = Ac / V1
     dtimeSinceTrtStart = 1.0 if dose_active else 0.0
 
-    K = kkill * EXPOSURE * np.exp(-lambda_res * timeSinceTrtStart) * np.exp(-0.1*TS) if dose_active else 0.0
+    K = kkill * EXPOSURE * math.exp(-lambda_res * timeSinceTrtStart - 0.1*TS) if dose_active else 0.0
 
     if TS > 1e12:
         dTS = 0
@@ -72,56 +74,65 @@ def tgi_model(t, y, dose_active=True):
     else:
         dTS = kge * TS - K * TS
 
-    return [dA_gut, dAc, dAp, dTS, dtimeSinceTrtStart]
+    return dA_gut, dAc, dAp, dTS, dtimeSinceTrtStart
 
 # -----------------------------
-# 4. SIMULAZIONE STEP PER STEP
+# 4. SIMULAZIONE PER SEGMENTI
 # -----------------------------
 dt_step = 0.1
 t_eval = np.arange(0, sim_duration + dt_step, dt_step)
 
 # stato iniziale
-A_gut = 0.0
-Ac = 0.0
-Ap = 0.0
-TS = TS0
-timeSinceTrtStart = 0.0
-y_current = [A_gut, Ac, Ap, TS, timeSinceTrtStart]
-
-TS_list = []
-EXPOSURE_list = []
-t_list = []
-
-t_current = 0.0
-dose_index = 0
+y_current = [0.0, 0.0, 0.0, TS0, 0.0]
+
+# array preallocati: un valore per passo, niente append su liste Python
+n_step = len(t_eval) - 1
+TS_array = np.empty(n_step)
+EXPOSURE_array = np.empty(n_step)
+t_array = np.empty(n_step)
+
+# indici di griglia a cui somministrare le dosi: il confronto in virgola
+# mobile abs(t - dose_times[k]) < 1e-6 diventa un confronto intero
+dose_step_indices = np.searchsorted(t_eval, dose_times - 1e-6)
+
+# precalcola una volta sola, per ogni punto della griglia, se siamo in
+# trattamento (t entro 0.5 giorni da un dose_time): searchsorted trova i
+# due dose_times piu' vicini invece di scandire tutto l'array ad ogni passo
+idx = np.searchsorted(dose_times, t_eval)
+prima = dose_times[np.clip(idx - 1, 0, len(dose_times) - 1)]
+dopo = dose_times[np.clip(idx, 0, len(dose_times) - 1)]
+dose_active_mask = (np.isclose(t_eval, prima, atol=0.5)
+                    | np.isclose(t_eval, dopo, atol=0.5))
+
+# confini dei segmenti: impulsi di dose e cambi di dose_active; dentro un
+# segmento il modello e' liscio, quindi basta una sola chiamata adattiva
+# al solutore con t_eval sulla griglia fine (niente re-integrazione per
+# ogni passo dt_step)
+cambi = np.nonzero(dose_active_mask[1:] != dose_active_mask[:-1])[0] + 1
+confini = np.unique(np.concatenate([[0], dose_step_indices, cambi, [n_step]]))
 
-for t_next in t_eval[1:]:
-    # somministra dose se siamo al tempo giusto (dose_times dati in giorni interi)
-    # confronto con tolleranza perché t_current può non essere esattamente intero
-    if dose_index < len(dose_times) and abs(t_current - dose_times[dose_index]) < 1e-6:
+dose_index = 0
+for i_inizio, i_fine in zip(confini[:-1], confini[1:]):
+    # somministra dose se il segmento inizia a un dose_time
+    if dose_index < len(dose_step_indices) and i_inizio == dose_step_indices[dose_index]:
         y_current[0] += dose  # aggiunge dose in A_gut
         dose_index += 1
 
-    # siamo in trattamento se t_current coincide con uno dei dose_times (usiamo isclose con atol)
-    dose_active = np.any(np.isclose(t_current, dose_times, atol=0.5))
+    dose_active = dose_active_mask[i_inizio]
 
-    # integra da t_current a t_next
-    sol = solve_ivp(lambda tt, yy: tgi_model(tt, yy, dose_active=dose_active),
-                    [t_current, t_next], y_current, t_eval=[t_next], method='RK45')
+    # integra tutto il segmento in un colpo solo (odeint chiama il core
+    # Fortran di LSODA direttamente, con meno overhead di solve_ivp)
+    t_seg = t_eval[i_inizio:i_fine + 1]
+    y_seg = odeint(tgi_model, y_current, t_seg,
+                   rtol=1e-6, atol=1e-9, tfirst=True, args=(dose_active,))
 
-    # estrai stato finale
-    y_current = sol.y[:, -1].tolist()
-    t_current = t_next
-
-    A_gut, Ac, Ap, TS, timeSinceTrtStart = y_current
-    TS_list.append(TS)
-    EXPOSURE_list.append(Ac / V1)
-    t_list.append(t_current)
-
-# arrays
-t_array = np.array(t_list)
-TS_array = np.array(TS_list)
-EXPOSURE_array = np.array(EXPOSURE_list)
+    y_current = y_seg[-1]
+    if y_current[3] < 1e-12:
+        # tumore sparito: blocca TS esattamente a zero
+        y_current[3] = 0.0
+    TS_array[i_inizio:i_fine] = y_seg[1:, 3]
+    EXPOSURE_array[i_inizio:i_fine] = y_seg[1:, 1] / V1
+    t_array[i_inizio:i_fine] = t_seg[1:]
 
 # -----------------------------
 # 5. CREAZIONE ANIMAZIONE (SFERA 3D + GRAFICI DINAMICI)
@@ -139,10 +150,25 @@ ax3d.set_box_aspect([1,1,1])
 ax3d.set_title("Évolution de la tumeur")
 
 # mesh sfera
-u = np.linspace(0, 2*np.pi, 50)
-v = np.linspace(0, np.pi, 50)
+u = np.linspace(0, 2*np.pi, 20)
+v = np.linspace(0, np.pi, 20)
 U, V = np.meshgrid(u, v)
 
+# vertici della sfera unitaria, costruiti una volta sola: l'animazione si
+# limita poi a riscalarli con set_verts
+punti_unita = np.stack([np.cos(U) * np.sin(V),
+                        np.sin(U) * np.sin(V),
+                        np.cos(V)], axis=-1)
+facce_unita = np.stack([punti_unita[:-1, :-1], punti_unita[:-1, 1:],
+                        punti_unita[1:, 1:], punti_unita[1:, :-1]],
+                       axis=2).reshape(-1, 4, 3)
+sphere = Poly3DCollection(facce_unita * (TS_array[0] / 2.0), color='red', alpha=0.6)
+ax3d.add_collection3d(sphere)
+
+# contatore dei giorni dentro gli assi 3D: a differenza del titolo resta
+# dentro ax3d.bbox e puo' quindi essere ridisegnato correttamente col blit
+testo_giorno = ax3d.text2D(0.5, 0.92, "", transform=ax3d.transAxes, ha='center')
+
 # asse diametro (2D)
 ax_diam = fig.add_subplot(2, 2, 2)
 line_diam, = ax_diam.plot([], [], 'r', linewidth=2, label='Diamètre tumeur')  # diametro rosso
@@ -176,6 +202,14 @@ ax_exp.set_title("Exposition au cours du temps")
 ax_exp.set_box_aspect(1)
 ax_exp.legend(loc='upper left', bbox_to_anchor=(1.05, 1))
 
+# buffer a lunghezza piena: l'asse x viene fissato una volta sola e i frame
+# si limitano a riempire i valori y gia' allocati (niente slicing crescente
+# dei vettori ad ogni frame)
+diam_buffer = np.full(len(t_array), np.nan)
+expo_buffer = np.full(len(t_array), np.nan)
+line_diam.set_data(t_array, diam_buffer)
+line_exp.set_data(t_array, expo_buffer)
+
 # indici dei frame: mostriamo un frame ogni 10 giorni (accelera l'animazione)
 frame_indices = np.arange(0, len(t_array), int(10/dt_step))
 if frame_indices[-1] != len(t_array)-1:
@@ -185,22 +219,20 @@ if frame_indices[-1] != len(t_array)-1:
 def update(frame_idx):
     frame = frame_indices[frame_idx]
 
-    # aggiorna sfera 3D (rimuovendo precedenti surface)
-    for coll in list(ax3d.collections):
-        coll.remove()
-    R = TS_array[frame] / 2.0
-    X = R * np.cos(U) * np.sin(V)
-    Y = R * np.sin(U) * np.sin(V)
-    Z = R * np.cos(V)
-    ax3d.plot_surface(X, Y, Z, color='red', alpha=0.6)
-    ax3d.set_title(f"Tumeur - Jour {t_array[frame]:.1f}")
+    # aggiorna sfera 3D: riscala i vertici precalcolati
+    sphere.set_verts(facce_unita * (TS_array[frame] / 2.0))
+    # col blit, draw_artist non rifa' la proiezione 3D: va forzata qui,
+    # altrimenti la sfera non viene mai renderizzata
+    sphere.do_3d_projection()
+    testo_giorno.set_text(f"Jour {t_array[frame]:.1f}")
 
-    # aggiorna linee 2D progressive
-    # per evitare problemi di plotting su indici 0, usiamo frame+1
-    line_diam.set_data(t_array[:frame+1], TS_array[:frame+1])
-    line_exp.set_data(t_array[:frame+1], EXPOSURE_array[:frame+1])
+    # aggiorna linee 2D progressive riempiendo i buffer preallocati
+    diam_buffer[:frame+1] = TS_array[:frame+1]
+    expo_buffer[:frame+1] = EXPOSURE_array[:frame+1]
+    line_diam.set_ydata(diam_buffer)
+    line_exp.set_ydata(expo_buffer)
 
-    return ax3d, line_diam, line_exp
+    return sphere, line_diam, line_exp, testo_giorno
 
 # ANIMATION SENZA RIPETIZIONE
 ani = animation.FuncAnimation(
@@ -208,7 +240,7 @@ ani = animation.FuncAnimation(
     update,
     frames=len(frame_indices),
     interval=200,
-    blit=False,
+    blit=True,   # ridisegna solo gli artisti restituiti da update
     repeat=False  # <-- non ripete l'animazione
 )
 
@@ -1,5 +1,7 @@
+import math
+
 import numpy as np
-from scipy.integrate import solve_ivp
+from numba import njit
 import matplotlib.pyplot as plt
 from matplotlib import animation
 from mpl_toolkits.mplot3d import Axes3D
@@ -12,6 +14,8 @@ CL = 818.4
 V1 = 2700
 V2 = 774
 Q = 16.512
+k12 = Q / V1
+k21 = Q / V2
 
 kge = 0.001
 kkill = 0.1
@@ -29,58 +33,83 @@ duree_simulation = 365
 dt_step = 0.1  # pas d'intégration
 
 # -----------------------------
-# 3. MODÈLE ODE
+# 3. MODÈLE ODE (compilé par Numba)
 # -----------------------------
-def modele_tgi(t, y, dose_active=True):
-    A_gut, Ac, Ap, TS, temps_depuis_traitement = y
-    k12 = Q / V1
-    k21 = Q / V2
-
+# L'état circule sous forme de 5 scalaires et les dérivées sont renvoyées
+# dans un tuple : aucune allocation de tableau dans la boucle compilée.
+@njit(cache=True, fastmath=True)
+def modele_tgi(A_gut, Ac, Ap, TS, temps_depuis_traitement, dose_active):
     dA_gut = -ka * A_gut
     dAc = ka * A_gut - k12*Ac - (CL/V1)*Ac + k21*Ap
     dAp = k12*Ac - k21*Ap
 
     EXPOSURE = Ac / V1
     dtemps_depuis_traitement = 1.0 if dose_active else 0.0
-    K = kkill * EXPOSURE * np.exp(-lambda_res * temps_depuis_traitement) * np.exp(-0.1*TS) if dose_active else 0.0
+    if dose_active:
+        K = kkill * EXPOSURE * math.exp(-lambda_res * temps_depuis_traitement - 0.1*TS)
+    else:
+        K = 0.0
 
     if TS > 1e12:
-        dTS = 0
+        dTS = 0.0
     elif TS < 0.08:
         dTS = -K * TS
     else:
         dTS = kge * TS - K * TS
 
-    return [dA_gut, dAc, dAp, dTS, dtemps_depuis_traitement]
+    return dA_gut, dAc, dAp, dTS, dtemps_depuis_traitement
+
+@njit(cache=True, fastmath=True)
+def pas_rk4(A_gut, Ac, Ap, TS, tau, h, dose_active):
+    a1, c1, p1, s1, u1 = modele_tgi(A_gut, Ac, Ap, TS, tau, dose_active)
+    a2, c2, p2, s2, u2 = modele_tgi(A_gut + 0.5*h*a1, Ac + 0.5*h*c1, Ap + 0.5*h*p1,
+                                    TS + 0.5*h*s1, tau + 0.5*h*u1, dose_active)
+    a3, c3, p3, s3, u3 = modele_tgi(A_gut + 0.5*h*a2, Ac + 0.5*h*c2, Ap + 0.5*h*p2,
+                                    TS + 0.5*h*s2, tau + 0.5*h*u2, dose_active)
+    a4, c4, p4, s4, u4 = modele_tgi(A_gut + h*a3, Ac + h*c3, Ap + h*p3,
+                                    TS + h*s3, tau + h*u3, dose_active)
+    return (A_gut + h/6 * (a1 + 2*a2 + 2*a3 + a4),
+            Ac + h/6 * (c1 + 2*c2 + 2*c3 + c4),
+            Ap + h/6 * (p1 + 2*p2 + 2*p3 + p4),
+            TS + h/6 * (s1 + 2*s2 + 2*s3 + s4),
+            tau + h/6 * (u1 + 2*u2 + 2*u3 + u4))
+
+@njit(cache=True, fastmath=True)
+def simule_tgi(t_eval, indices_doses, dose, duree_traitement, dt_step, TS0):
+    A_gut, Ac, Ap, TS, tau = 0.0, 0.0, 0.0, TS0, 0.0
+    TS_array = np.empty(len(t_eval))
+    EXPOSURE_array = np.empty(len(t_eval))
+
+    indice_dose = 0
+    for i in range(len(t_eval)):
+        t = t_eval[i]
+        if indice_dose < len(indices_doses) and i == indices_doses[indice_dose]:
+            A_gut += dose
+            indice_dose += 1
+
+        dose_active = t <= duree_traitement
+
+        if TS < 1e-12:
+            # tumeur disparue : TS reste exactement à zéro
+            TS = 0.0
+        A_gut, Ac, Ap, TS, tau = pas_rk4(A_gut, Ac, Ap, TS, tau, dt_step, dose_active)
+        TS_array[i] = TS
+        EXPOSURE_array[i] = Ac / V1
+
+    return TS_array, EXPOSURE_array
 
 # -----------------------------
 # 4. SIMULATION
 # -----------------------------
 t_eval = np.arange(0, duree_simulation + dt_step, dt_step)
 
-A_gut, Ac, Ap, TS, temps_depuis_traitement = 0.0, 0.0, 0.0, TS0, 0.0
-TS_list, EXPOSURE_list, t_list = [], [], []
-
-indice_dose = 0
-for t in t_eval:
-    if indice_dose < len(temps_doses) and abs(t - temps_doses[indice_dose]) < 1e-6:
-        A_gut += dose
-        indice_dose += 1
+# indices de la grille où tombent les doses (comparaison entière au lieu
+# d'un test en virgule flottante à chaque pas)
+indices_doses = np.searchsorted(t_eval, temps_doses - 1e-6)
 
-    dose_active = t <= duree_traitement
-
-    y_current = [A_gut, Ac, Ap, TS, temps_depuis_traitement]
-    sol = solve_ivp(lambda t, y: modele_tgi(t, y, dose_active=dose_active),
-                    [0, dt_step], y_current, method='RK45', t_eval=[dt_step])
-    A_gut, Ac, Ap, TS, temps_depuis_traitement = sol.y[:, -1]
-
-    TS_list.append(TS)
-    EXPOSURE_list.append(Ac / V1)
-    t_list.append(t)
-
-TS_array = np.array(TS_list)
-EXPOSURE_array = np.array(EXPOSURE_list)
-t_array = np.array(t_list)
+TS_array, EXPOSURE_array = simule_tgi(t_eval, indices_doses, float(dose),
+                                      duree_traitement, dt_step, TS0)
+t_array = t_eval
 
 # -----------------------------
 # 5. ANIMATION: SPHÈRE + COURBES + RÉFÉRENCES + RÉGION TOXICITÉ + LIGNES FIN TRAITEMENT
@@ -96,8 +125,8 @@ ax3d.set_zlim([-TS0, TS0])
 ax3d.set_box_aspect([1,1,1])
 ax3d.set_title("Évolution de la tumeur")
 
-u = np.linspace(0, 2*np.pi, 50)
-v = np.linspace(0, np.pi, 50)
+u = np.linspace(0, 2*np.pi, 20)
+v = np.linspace(0, np.pi, 20)
 U, V = np.meshgrid(u, v)
 
 # Subplot diamètre
@@ -127,6 +156,14 @@ ax_exp.set_title("Exposition au cours du temps")
 ax_exp.set_box_aspect(1)
 ax_exp.legend(loc='upper left', bbox_to_anchor=(1.05, 1))
 
+# tampons pleine longueur : l'axe x est fixé une fois pour toutes et les
+# frames ne font que remplir les valeurs y déjà allouées (pas de re-tranchage
+# des tableaux qui grossit à chaque frame)
+diam_buffer = np.full(len(t_array), np.nan)
+expo_buffer = np.full(len(t_array), np.nan)
+line_diam.set_data(t_array, diam_buffer)
+line_exp.set_data(t_array, expo_buffer)
+
 # Frame tous les 10 jours
 frame_indices = np.arange(0, len(t_array), int(10/dt_step))
 
@@ -144,8 +181,10 @@ def update(frame_idx):
     ax3d.set_title(f"Tumeur - Jour {t_array[frame]:.1f}")
 
     # mise à jour courbes
-    line_diam.set_data(t_array[:frame+1], TS_array[:frame+1])
-    line_exp.set_data(t_array[:frame+1], EXPOSURE_array[:frame+1])
+    diam_buffer[:frame+1] = TS_array[:frame+1]
+    expo_buffer[:frame+1] = EXPOSURE_array[:frame+1]
+    line_diam.set_ydata(diam_buffer)
+    line_exp.set_ydata(expo_buffer)
 
     return ax3d, line_diam, line_exp
 
@@ -0,0 +1,136 @@
+import numpy as np
+from multiprocessing import Pool
+from scipy.integrate import solve_ivp
+import matplotlib.pyplot as plt
+
+# -----------------------------
+# 1. PARAMÈTRES
+# -----------------------------
+ka = 3.024
+CL = 818.4
+V1 = 2700
+V2 = 774
+Q = 16.512
+k12 = Q / V1
+k21 = Q / V2
+
+kge = 0.001
+kkill = 0.1
+lambda_res = 0.002
+tailles_initiales = [0.1, 1.0, 10.0]  # diamètres initiaux [cm] : petite, moyenne, grosse
+
+# -----------------------------
+# 2. SCÉNARIOS (balayage doses x durées)
+# -----------------------------
+# Tous les scénarios à dose régulière (cartes 1 à 9) partagent la même
+# grille de doses : on peut donc les simuler tous en même temps avec un
+# état 2-D (5 variables x N scénarios) passé à un seul solveur.
+doses = [20, 50, 100]
+durees_traitement = [84, 252, 365]
+scenarios = [(d, dt) for d in doses for dt in durees_traitement]
+doses_scenarios = np.array([d for d, _ in scenarios], dtype=float)
+durees_scenarios = np.array([dt for _, dt in scenarios], dtype=float)
+n_scenarios = len(scenarios)
+
+intervalle_dose = 2.0
+temps_doses = np.arange(0, max(durees_traitement) + 0.1, intervalle_dose)
+duree_simulation = 365
+dt_step = 0.1  # pas d'intégration
+
+# -----------------------------
+# 3. MODÈLE ODE VECTORISÉ
+# -----------------------------
+def modele_tgi_batch(t, y, dose_active):
+    """Second membre du modèle TGI pour N scénarios à la fois.
+
+    y est l'état aplati de forme (5*N,) ; dose_active est un masque
+    booléen de forme (N,) indiquant les scénarios encore en traitement.
+    """
+    A_gut, Ac, Ap, TS, temps_depuis_traitement = y.reshape(5, -1)
+    dA_gut = -ka * A_gut
+    dAc = ka * A_gut - k12*Ac - (CL/V1)*Ac + k21*Ap
+    dAp = k12*Ac - k21*Ap
+
+    EXPOSURE = Ac / V1
+    dtemps_depuis_traitement = np.where(dose_active, 1.0, 0.0)
+    K = np.where(dose_active,
+                 kkill * EXPOSURE * np.exp(-lambda_res * temps_depuis_traitement - 0.1*TS),
+                 0.0)
+
+    dTS = np.where(TS > 1e12, 0.0,
+                   np.where(TS < 0.08, -K * TS, kge * TS - K * TS))
+
+    return np.concatenate([dA_gut, dAc, dAp, dTS, dtemps_depuis_traitement])
+
+# -----------------------------
+# 4. SIMULATION D'UNE TAILLE INITIALE
+# -----------------------------
+def simuler_balayage(TS0):
+    """Simule les 9 scénarios dose x durée pour un diamètre initial donné."""
+    t_eval = np.arange(0, duree_simulation + dt_step, dt_step)
+
+    y_current = np.zeros((5, n_scenarios))
+    y_current[3] = TS0
+    TS_list, EXPOSURE_list, t_list = [], [], []
+
+    bornes = np.append(temps_doses, duree_simulation)
+    for t_debut, t_fin in zip(bornes[:-1], bornes[1:]):
+        # impulsion de dose pour les scénarios encore en traitement
+        y_current[0] += np.where(t_debut <= durees_scenarios, doses_scenarios, 0.0)
+        dose_active = t_fin <= durees_scenarios
+
+        t_seg = t_eval[(t_eval >= t_debut) & (t_eval < t_fin)]
+        sol = solve_ivp(modele_tgi_batch, [t_debut, t_fin], y_current.ravel(),
+                        t_eval=np.append(t_seg, t_fin),
+                        method='LSODA', rtol=1e-6, atol=1e-9,
+                        args=(dose_active,))
+        etats = sol.y.reshape(5, n_scenarios, -1)
+        y_current = etats[:, :, -1]
+
+        TS_list.append(etats[3, :, :-1])
+        EXPOSURE_list.append(etats[1, :, :-1] / V1)
+        t_list.append(sol.t[:-1])
+
+    # état final en fin de simulation
+    t_array = np.append(np.concatenate(t_list), bornes[-1])
+    TS_array = np.column_stack([np.concatenate(TS_list, axis=1), y_current[3]])
+    EXPOSURE_array = np.column_stack([np.concatenate(EXPOSURE_list, axis=1), y_current[1] / V1])
+    return t_array, TS_array, EXPOSURE_array
+
+# -----------------------------
+# 5. SIMULATIONS EN PARALLÈLE + FIGURES
+# -----------------------------
+if __name__ == "__main__":
+    # une taille initiale par processus : les trois balayages tournent en
+    # même temps sur des cœurs différents
+    with Pool(processes=len(tailles_initiales)) as pool:
+        resultats = pool.map(simuler_balayage, tailles_initiales)
+
+    fig, axes = plt.subplots(len(tailles_initiales), 2, figsize=(14, 16))
+    fig.suptitle("Balayage doses x durées x tailles initiales", fontsize=16, y=0.99)
+
+    for ligne, (TS0, (t_array, TS_array, EXPOSURE_array)) in enumerate(
+            zip(tailles_initiales, resultats)):
+        ax_diam, ax_exp = axes[ligne]
+
+        for i, (d, dt) in enumerate(scenarios):
+            etiquette = f"dose {d} - durée {dt} j"
+            ax_diam.plot(t_array, TS_array[i], label=etiquette)
+            ax_exp.plot(t_array, EXPOSURE_array[i], label=etiquette)
+
+        ax_diam.axhline(TS0, color='k', linestyle='--', label='Diamètre initial')
+        ax_diam.set_xlim(0, duree_simulation)
+        ax_diam.set_xlabel("Temps (jours)")
+        ax_diam.set_ylabel("Diamètre (cm)")
+        ax_diam.set_title(f"Diamètre - taille initiale {TS0} cm")
+        ax_diam.legend(fontsize=7)
+
+        ax_exp.axhline(0.06, color='b', linestyle='--', label='Toxicité maximale')
+        ax_exp.set_xlim(0, duree_simulation)
+        ax_exp.set_xlabel("Temps (jours)")
+        ax_exp.set_ylabel("Exposition")
+        ax_exp.set_title(f"Exposition - taille initiale {TS0} cm")
+        ax_exp.legend(fontsize=7)
+
+    plt.tight_layout(rect=[0, 0, 1, 0.97])
+    plt.show()